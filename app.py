@@ -1,16 +1,32 @@
 import os
 
+if os.getenv("GEVENT") == "1":
+    # Patch blocking I/O before psycopg2 (via the avatar package) is imported.
+    # Gunicorn's gevent worker has already patched by the time it imports us.
+    from gevent import monkey
+
+    if not monkey.is_module_patched("socket"):
+        monkey.patch_all()
+
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
 
 from avatar import avatar_bp, init_app as init_avatar
 from auth import auth_bp, init_app as init_auth
+from json_provider import OrJSONProvider
 
 from dotenv import load_dotenv
 load_dotenv()
 
 app = Flask(__name__)
+app.json = OrJSONProvider(app)
+app.json.sort_keys = False
+app.json.compact = True
 
 
 allowed_origins_env = os.environ.get("CORS_ALLOWED_ORIGINS", "http://localhost:5177,http://127.0.0.1:5177,https://app.fitspace.fashion")
@@ -115,5 +131,5 @@ def handle_uncaught_exception(exc: Exception):
 
 
 if __name__ == '__main__':
-    # App Runner will call gunicorn, but this allows local testing
-    app.run(host='0.0.0.0', port=8080, debug=True)
\ No newline at end of file
+    # The werkzeug development server is single-threaded; serve through gunicorn.
+    app.logger.warning("Use: gunicorn -c gunicorn.conf.py app:app")
\ No newline at end of file
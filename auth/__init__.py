@@ -1,13 +1,18 @@
 """Authentication utilities and endpoints for the Fitspace backend."""
 from __future__ import annotations
 
+import hashlib
+import hmac
 import os
+import threading
+import time
 from datetime import datetime, timedelta, timezone
 from functools import wraps
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import jwt
-from flask import Blueprint, abort, current_app, g, jsonify, request
+from cachetools import TLRUCache
+from flask import Blueprint, abort, g, jsonify, request
 
 __all__ = [
     "auth_bp",
@@ -21,28 +26,47 @@ __all__ = [
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
+# Upper bound (in seconds) for how long decoded claims stay cached.
+_TOKEN_CACHE_MAX_TTL = 3600
+
+
+# Claims every accepted token must carry; PyJWT rejects tokens without them.
+_REQUIRED_CLAIMS = ["sub", "exp"]
+
+# Reused decoder instance so option handling is not rebuilt per call.
+_pyjwt = jwt.PyJWT()
+
+
+def _token_cache_ttu(_key: bytes, decoded: Dict[str, Any], now: float) -> float:
+    return min(float(decoded["exp"]), now + _TOKEN_CACHE_MAX_TTL)
+
+
+# Decoded claims of recently verified tokens, keyed by a digest of the token so
+# raw bearer tokens are never kept in memory. Only successfully decoded tokens
+# are inserted.
+_token_cache: TLRUCache = TLRUCache(maxsize=10000, ttu=_token_cache_ttu, timer=time.time)
+_token_cache_lock = threading.Lock()
+
 
 # ---------------------------------------------------------------------------
 # Configuration helpers
 # ---------------------------------------------------------------------------
 
 
-def _get_secret_key() -> str:
-    secret = current_app.config.get("JWT_SECRET")
-    if not secret:
-        raise RuntimeError(
-            "JWT_SECRET is not configured. Call auth.init_app(app) during application setup."
-        )
-    return secret
-
+# Secret, algorithm and token lifetime captured by ``init_app`` so the request
+# path does not resolve ``current_app.config`` on every call.
+_jwt_config: Optional[Tuple[str, str, timedelta]] = None
 
-def _get_algorithm() -> str:
-    return current_app.config.get("JWT_ALGORITHM", "HS256")
+# Expected API key for token issuance, encoded once for constant-time comparison.
+_auth_api_key: Optional[bytes] = None
 
 
-def _get_expiration_delta() -> timedelta:
-    seconds = int(current_app.config.get("JWT_EXP_SECONDS", 3600))
-    return timedelta(seconds=seconds)
+def _get_jwt_config() -> Tuple[str, str, timedelta]:
+    if _jwt_config is None:
+        raise RuntimeError(
+            "JWT_SECRET is not configured. Call auth.init_app(app) during application setup."
+        )
+    return _jwt_config
 
 
 # ---------------------------------------------------------------------------
@@ -65,6 +89,20 @@ def init_app(app) -> None:
     app.config.setdefault("JWT_EXP_SECONDS", 3600)
     app.config.setdefault("AUTH_API_KEY", os.getenv("AUTH_API_KEY"))
 
+    api_key = app.config.get("AUTH_API_KEY")
+
+    global _jwt_config, _auth_api_key
+    _auth_api_key = api_key.encode("utf-8") if api_key else None
+    _jwt_config = (
+        app.config["JWT_SECRET"],
+        app.config["JWT_ALGORITHM"],
+        timedelta(seconds=int(app.config["JWT_EXP_SECONDS"])),
+    )
+
+    # Claims verified under a previous secret must not outlive it.
+    with _token_cache_lock:
+        _token_cache.clear()
+
 
 # ---------------------------------------------------------------------------
 # Token handling
@@ -80,8 +118,9 @@ def _issue_token(
 ) -> Dict[str, Any]:
     """Create a signed JWT for the specified user."""
 
+    secret, algorithm, expiration_delta = _get_jwt_config()
     now = datetime.now(timezone.utc)
-    expiration = now + _get_expiration_delta()
+    expiration = now + expiration_delta
     payload: Dict[str, Any] = {
         "sub": user_id,
         "iat": int(now.timestamp()),
@@ -96,7 +135,7 @@ def _issue_token(
     if refresh_token:
         payload["refreshToken"] = refresh_token
 
-    token = jwt.encode(payload, _get_secret_key(), algorithm=_get_algorithm())
+    token = jwt.encode(payload, secret, algorithm=algorithm)
     if isinstance(token, bytes):
         token = token.decode("utf-8")
 
@@ -111,7 +150,7 @@ def _issue_token(
     response: Dict[str, Any] = {
         "token": token,
         "tokenType": "Bearer",
-        "expiresIn": int(_get_expiration_delta().total_seconds()),
+        "expiresIn": int(expiration_delta.total_seconds()),
         "issuedAt": payload["iat"],
         "expiresAt": payload["exp"],
         "user": {"id": user_id},
@@ -143,11 +182,11 @@ def create_token():
         abort(400, description="Request payload must include a string 'userId'.")
 
     api_key = payload.get("apiKey")
-    expected_key = current_app.config.get("AUTH_API_KEY")
-    if expected_key and api_key != expected_key:
-        abort(401, description="Provided API key is invalid.")
+    if _auth_api_key is not None:
+        provided_key = api_key.encode("utf-8") if isinstance(api_key, str) else b""
+        if not hmac.compare_digest(provided_key, _auth_api_key):
+            abort(401, description="Provided API key is invalid.")
 
-    token_response = _issue_token(user_id)
     email = payload.get("email")
     if email is not None and not isinstance(email, str):
         abort(400, description="If provided, 'email' must be a string.")
@@ -174,32 +213,56 @@ def create_token():
 # ---------------------------------------------------------------------------
 
 
-def authenticate_request() -> str:
-    """Validate the bearer token in the request and populate ``g.current_user``."""
+def _decode_token(token: str) -> Dict[str, Any]:
+    """Return the verified claims of ``token``, reusing cached results when possible."""
 
-    if getattr(g, "current_user", None):
-        return g.current_user["id"]
+    cache_key = hashlib.blake2b(token.encode("utf-8"), digest_size=16).digest()
+    with _token_cache_lock:
+        decoded = _token_cache.get(cache_key)
 
-    auth_header = request.headers.get("Authorization", "")
-    scheme, _, token = auth_header.partition(" ")
-    if scheme.lower() != "bearer" or not token:
-        abort(401, description="Authorization header must contain a Bearer token.")
+    if decoded is not None and decoded["exp"] > int(time.time()):
+        return decoded
 
+    secret, algorithm, _ = _get_jwt_config()
     try:
-        decoded = jwt.decode(
+        decoded = _pyjwt.decode(
             token,
-            _get_secret_key(),
-            algorithms=[_get_algorithm()],
+            secret,
+            algorithms=[algorithm],
+            options={"require": _REQUIRED_CLAIMS, "verify_aud": False},
+            leeway=0,
         )
     except jwt.ExpiredSignatureError:
         abort(401, description="Authentication token has expired.")
+    except jwt.MissingRequiredClaimError as exc:
+        abort(401, description=f"Authentication token is missing the '{exc.claim}' claim.")
     except jwt.InvalidTokenError:
         abort(401, description="Authentication token is invalid.")
 
-    user_id = decoded.get("sub")
-    if not user_id:
+    # "require" only checks presence; an empty subject must not authenticate.
+    if not decoded["sub"]:
         abort(401, description="Authentication token is missing a subject (user).")
 
+    with _token_cache_lock:
+        _token_cache[cache_key] = decoded
+    return decoded
+
+
+def authenticate_request() -> str:
+    """Validate the bearer token in the request and populate ``g.current_user``."""
+
+    if getattr(g, "current_user", None):
+        return g.current_user["id"]
+
+    auth_header = request.headers.get("Authorization", "")
+    scheme, _, token = auth_header.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        abort(401, description="Authorization header must contain a Bearer token.")
+
+    decoded = _decode_token(token)
+
+    user_id = decoded["sub"]
+
     header_email = request.headers.get("X-User-Email") or decoded.get("email")
     if header_email is None:
         abort(400, description="Header 'X-User-Email' je obavezan za avatar API pozive.")
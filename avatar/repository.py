@@ -3,35 +3,136 @@ from __future__ import annotations
 
 import atexit
 import os
+import threading
 import uuid
 from contextlib import contextmanager
 from datetime import datetime, timezone
-from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from functools import lru_cache
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import psycopg2
 from psycopg2 import errors
-from psycopg2.extras import Json, RealDictCursor, register_uuid
-from psycopg2.pool import SimpleConnectionPool
+from psycopg2.extras import Json, RealDictCursor, execute_values, register_uuid
+from psycopg2.pool import ThreadedConnectionPool
 
 
 # Measurement keys that should not be treated as numeric values.
 _MEASUREMENT_STATUS_KEYS = {"creationMode"}
 
+# Rows sent per multi-row INSERT statement when persisting measurements.
+_INSERT_PAGE_SIZE = 200
+
 
 # ---------------------------------------------------------------------------
 # Connection handling
 # ---------------------------------------------------------------------------
 
-_pool: Optional[SimpleConnectionPool] = None
+_pool: Optional[ThreadedConnectionPool] = None
+_pool_settings: Optional[Tuple[int, int, str]] = None
+_pool_lock = threading.Lock()
 _close_registered = False
 
+# One slot per pooled connection. ThreadedConnectionPool.getconn raises
+# PoolError as soon as the pool is empty, so callers wait for a slot first.
+# Created together with the pool, i.e. after gevent has patched threading.
+_pool_slots: Optional[threading.BoundedSemaphore] = None
+
+# Random bytes for new avatar ids, fetched from the OS in one call per batch.
+# The owning pid is recorded so forked workers never reuse the parent's bytes.
+_UUID_BATCH_SIZE = 256
+_uuid_bytes = b""
+_uuid_offset = 0
+_uuid_pid = 0
+_uuid_lock = threading.Lock()
+
+# Hot read queries prepared once per pooled connection. PostgreSQL keeps the
+# parsed statement and its plan for the lifetime of the server session.
+_PREPARED_STATEMENTS: Dict[str, str] = {
+    # One row per requested avatar with every measurement section aggregated
+    # to JSON, so loading any number of avatars costs a single round-trip.
+    # Morphs are sorted with the "C" collation to match Python string order.
+    # Timestamps are rendered in a fixed UTC format with six fraction digits so
+    # the JSON text does not depend on the session TimeZone and parses with
+    # datetime.fromisoformat on every supported Python version.
+    "fetch_measurements": """
+        SELECT
+            a.id AS avatar_id,
+            (
+                SELECT json_object_agg(measurement_key, value)
+                FROM avatar_basic_measurements
+                WHERE avatar_id = a.id
+            ) AS basic,
+            (
+                SELECT json_object_agg(measurement_key, value)
+                FROM avatar_body_measurements
+                WHERE avatar_id = a.id
+            ) AS body,
+            (
+                SELECT json_agg(
+                    json_build_object(
+                        'id', amt.morph_id,
+                        'backendKey', COALESCE(NULLIF(amt.backend_key, ''), md.backend_key),
+                        'sliderValue', amt.slider_value,
+                        'unrealValue', amt.unreal_value,
+                        'updatedAt', to_char(
+                            amt.updated_at AT TIME ZONE 'UTC',
+                            'YYYY-MM-DD"T"HH24:MI:SS.US"Z"'
+                        )
+                    )
+                    ORDER BY amt.morph_id COLLATE "C"
+                )
+                FROM avatar_morph_targets AS amt
+                LEFT JOIN morph_definitions AS md ON md.id = amt.morph_id
+                WHERE amt.avatar_id = a.id
+            ) AS morphs,
+            (
+                SELECT json_build_object(
+                    'body_shape', q.body_shape,
+                    'athletic_level', q.athletic_level,
+                    'measurements', q.measurements,
+                    'updated_at', to_char(
+                        q.updated_at AT TIME ZONE 'UTC',
+                        'YYYY-MM-DD"T"HH24:MI:SS.US"Z"'
+                    )
+                )
+                FROM avatar_quickmode_settings AS q
+                WHERE q.avatar_id = a.id
+            ) AS quick_mode_settings
+        FROM unnest($1) AS a(id)
+    """,
+}
+
 
 class RepositoryNotInitialized(RuntimeError):
     """Raised when repository functions are used before initialisation."""
 
 
+class _PooledConnection(psycopg2.extensions.connection):
+    """Connection that remembers whether its session has been prepared."""
+
+    prepared = False
+
+
 def init_app(app) -> None:
-    """Initialise the repository using the Flask application configuration."""
+    """Initialise the repository using the Flask application configuration.
+
+    The pool size is read from ``DB_POOL_MIN`` / ``DB_POOL_MAX``. Keep
+    ``DB_POOL_MAX`` multiplied by the number of gunicorn workers below the
+    PostgreSQL ``max_connections`` setting. Requests beyond ``DB_POOL_MAX``
+    in one worker wait for a free connection instead of failing.
+
+    The pool itself is opened on first use, so an app preloaded by the
+    gunicorn master does not hand the same connections to every forked worker.
+    """
 
     database_url = app.config.get("DATABASE_URL") or os.getenv("DATABASE_URL")
     if not database_url:
@@ -40,9 +141,12 @@ def init_app(app) -> None:
             "or the DATABASE_URL environment variable."
         )
 
-    global _pool, _close_registered
-    if _pool is None:
-        _pool = SimpleConnectionPool(1, 10, dsn=database_url)
+    global _pool_settings, _close_registered
+    _pool_settings = (
+        int(app.config.get("DB_POOL_MIN") or os.getenv("DB_POOL_MIN", "2")),
+        int(app.config.get("DB_POOL_MAX") or os.getenv("DB_POOL_MAX", "25")),
+        database_url,
+    )
 
     if not _close_registered:
         atexit.register(close_pool)
@@ -52,30 +156,65 @@ def init_app(app) -> None:
 def close_pool() -> None:
     """Close the global connection pool (if initialised)."""
 
-    global _pool
+    global _pool, _pool_slots
     if _pool is not None:
         _pool.closeall()
         _pool = None
+        _pool_slots = None
 
 
-@contextmanager
-def _connection() -> Iterator[psycopg2.extensions.connection]:
+def _get_pool() -> Tuple[ThreadedConnectionPool, threading.BoundedSemaphore]:
+    global _pool, _pool_slots
     if _pool is None:
-        raise RepositoryNotInitialized(
-            "Avatar repository not initialised. Call avatar.init_app(app) first."
-        )
+        if _pool_settings is None:
+            raise RepositoryNotInitialized(
+                "Avatar repository not initialised. Call avatar.init_app(app) first."
+            )
+        with _pool_lock:
+            if _pool is None:
+                minconn, maxconn, database_url = _pool_settings
+                # Publish the slots before the pool; the unlocked check reads _pool.
+                _pool_slots = threading.BoundedSemaphore(maxconn)
+                _pool = ThreadedConnectionPool(
+                    minconn,
+                    maxconn,
+                    dsn=database_url,
+                    connection_factory=_PooledConnection,
+                )
+    return _pool, _pool_slots
 
-    conn = _pool.getconn()
+
+@contextmanager
+def _connection() -> Iterator[psycopg2.extensions.connection]:
+    pool, slots = _get_pool()
+    slots.acquire()
     try:
-        register_uuid(conn_or_curs=conn)
-        conn.autocommit = False
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
+        conn = pool.getconn()
+        try:
+            if not conn.prepared:
+                _prepare_connection(conn)
+            conn.autocommit = False
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
     finally:
-        _pool.putconn(conn)
+        slots.release()
+
+
+def _prepare_connection(conn: _PooledConnection) -> None:
+    register_uuid(conn_or_curs=conn)
+    statements = ["DEALLOCATE ALL"]
+    statements.extend(
+        f"PREPARE {name} (uuid[]) AS {query}" for name, query in _PREPARED_STATEMENTS.items()
+    )
+    with conn.cursor() as cur:
+        cur.execute(";".join(statements))
+    conn.commit()
+    conn.prepared = True
 
 
 # ---------------------------------------------------------------------------
@@ -105,9 +244,30 @@ class AvatarQuotaExceededError(AvatarError):
 
 
 def _isoformat(dt: datetime) -> str:
-    return dt.astimezone(timezone.utc).replace(tzinfo=timezone.utc).isoformat().replace(
-        "+00:00", "Z"
-    )
+    # TIMESTAMPTZ values already arrive in UTC, so skip the conversion for them.
+    if dt.tzinfo is not timezone.utc:
+        dt = dt.astimezone(timezone.utc)
+    return dt.isoformat()[:-6] + "Z"
+
+
+@lru_cache(maxsize=1024)
+def _parse_uuid(value: str) -> uuid.UUID:
+    # Clients keep addressing the same few avatars, so repeated ids skip parsing.
+    return uuid.UUID(hex=value)
+
+
+def _new_uuid() -> uuid.UUID:
+    global _uuid_bytes, _uuid_offset, _uuid_pid
+
+    with _uuid_lock:
+        pid = os.getpid()
+        if _uuid_offset >= len(_uuid_bytes) or _uuid_pid != pid:
+            _uuid_bytes = os.urandom(16 * _UUID_BATCH_SIZE)
+            _uuid_offset = 0
+            _uuid_pid = pid
+        chunk = _uuid_bytes[_uuid_offset : _uuid_offset + 16]
+        _uuid_offset += 16
+    return uuid.UUID(bytes=chunk, version=4)
 
 
 def _coerce_datetime(value: Any) -> Optional[datetime]:
@@ -178,17 +338,6 @@ def _ensure_user(conn, user_id: str, *, user_context: Optional[Dict[str, Any]] =
         )
 
 
-def _find_available_slot(conn, user_id: str) -> int:
-    with conn.cursor() as cur:
-        cur.execute("SELECT slot FROM avatars WHERE user_id = %s", (user_id,))
-        used = {row[0] for row in cur.fetchall()}
-
-    for slot in range(1, 6):
-        if slot not in used:
-            return slot
-    raise AvatarQuotaExceededError("User has reached the maximum of five avatars.")
-
-
 def _persist_measurements(
     conn,
     avatar_id: uuid.UUID,
@@ -198,27 +347,56 @@ def _persist_measurements(
     morph_targets: Iterable[Dict[str, Any]],
     quick_mode_settings: Optional[Dict[str, Any]],
     quick_mode_settings_is_set: bool = False,
-) -> None:
-    basic = {k: v for k, v in basic.items() if k not in _MEASUREMENT_STATUS_KEYS}
-    body = {k: v for k, v in body.items() if k not in _MEASUREMENT_STATUS_KEYS}
+    written_at: datetime,
+) -> Tuple[
+    Dict[str, float],
+    Dict[str, float],
+    List[Dict[str, Any]],
+    Optional[Dict[str, Any]],
+]:
+    """Replace the avatar's measurements and return them in API shape.
+
+    ``written_at`` is the transaction timestamp returned for the avatar row;
+    ``NOW()`` is constant within a transaction, so it is also the morph target
+    ``updated_at``. The returned quick mode settings are only meaningful when
+    ``quick_mode_settings_is_set`` is true.
+    """
+
+    basic = {k: float(v) for k, v in basic.items() if k not in _MEASUREMENT_STATUS_KEYS}
+    body = {k: float(v) for k, v in body.items() if k not in _MEASUREMENT_STATUS_KEYS}
 
     with conn.cursor() as cur:
-        cur.execute("DELETE FROM avatar_basic_measurements WHERE avatar_id = %s", (avatar_id,))
-        cur.execute("DELETE FROM avatar_body_measurements WHERE avatar_id = %s", (avatar_id,))
-        cur.execute("DELETE FROM avatar_morph_targets WHERE avatar_id = %s", (avatar_id,))
+        # Data-modifying CTEs always run, so one statement clears all three tables.
+        cur.execute(
+            """
+            WITH
+                deleted_basic AS (
+                    DELETE FROM avatar_basic_measurements WHERE avatar_id = %s
+                ),
+                deleted_body AS (
+                    DELETE FROM avatar_body_measurements WHERE avatar_id = %s
+                )
+            DELETE FROM avatar_morph_targets WHERE avatar_id = %s
+            """,
+            (avatar_id, avatar_id, avatar_id),
+        )
 
         if basic:
-            cur.executemany(
+            execute_values(
+                cur,
                 "INSERT INTO avatar_basic_measurements (avatar_id, measurement_key, value) "
-                "VALUES (%s, %s, %s)",
+                "VALUES %s",
                 [(avatar_id, key, value) for key, value in basic.items()],
+                page_size=_INSERT_PAGE_SIZE,
             )
 
         if body:
-            cur.executemany(
+            execute_values(
+                cur,
                 "INSERT INTO avatar_body_measurements (avatar_id, measurement_key, value) "
-                "VALUES (%s, %s, %s)",
+                "VALUES %s",
                 [(avatar_id, key, value) for key, value in body.items()],
+                page_size=_INSERT_PAGE_SIZE,
             )
 
         morph_map: Dict[str, Dict[str, Any]] = {}
@@ -248,23 +426,30 @@ def _persist_measurements(
                 "unreal_value": unreal_value,
             }
 
+        definition_backend_keys: Dict[str, Optional[str]] = {}
         if morph_map:
             definition_records = [
                 (morph_id, data["backend_key"]) for morph_id, data in morph_map.items()
             ]
-            cur.executemany(
+            definition_rows = execute_values(
+                cur,
                 """
                 INSERT INTO morph_definitions (id, backend_key)
-                VALUES (%s, %s)
+                VALUES %s
                 ON CONFLICT (id) DO UPDATE
                 SET
                     backend_key = COALESCE(EXCLUDED.backend_key, morph_definitions.backend_key),
                     updated_at = NOW()
+                RETURNING id, backend_key
                 """,
                 definition_records,
+                page_size=_INSERT_PAGE_SIZE,
+                fetch=True,
             )
+            definition_backend_keys = dict(definition_rows)
 
-            cur.executemany(
+            execute_values(
+                cur,
                 """
                 INSERT INTO avatar_morph_targets (
                     avatar_id,
@@ -274,7 +459,7 @@ def _persist_measurements(
                     unreal_value,
                     updated_at
                 )
-                VALUES (%s, %s, %s, %s, %s, NOW())
+                VALUES %s
                 """,
                 [
                     (
@@ -286,8 +471,11 @@ def _persist_measurements(
                     )
                     for morph_id, data in morph_map.items()
                 ],
+                template="(%s, %s, %s, %s, %s, NOW())",
+                page_size=_INSERT_PAGE_SIZE,
             )
 
+        written_quick_mode_settings: Optional[Dict[str, Any]] = None
         # Quick mode settings: upsert (čuvamo created_at), ili brišemo ako nisu poslani
         if quick_mode_settings_is_set:
             if quick_mode_settings:
@@ -303,7 +491,7 @@ def _persist_measurements(
                 # updatedAt može doći iz klijenta; ako ga nema, koristimo server NOW()
                 updated_at_value = quick_mode_settings.get("updatedAt")
                 provided_updated_at = _coerce_datetime(updated_at_value)
-                effective_updated_at = provided_updated_at or datetime.now(timezone.utc)
+                effective_updated_at = provided_updated_at or written_at
 
                 cur.execute(
                     """
@@ -320,101 +508,126 @@ def _persist_measurements(
                     """,
                     (avatar_id, body_shape, athletic_level, Json(measurements), effective_updated_at),
                 )
+                written_quick_mode_settings = _quick_row_to_settings(
+                    {
+                        "body_shape": body_shape,
+                        "athletic_level": athletic_level,
+                        "measurements": measurements,
+                        "updated_at": effective_updated_at,
+                    }
+                )
             else:
                 # eksplicitno poslano kao null/prazno -> obriši
                 cur.execute(
                     "DELETE FROM avatar_quickmode_settings WHERE avatar_id = %s",
                     (avatar_id,),
                 )
-def _fetch_measurements(
-    conn, avatar_id: uuid.UUID
-) -> Tuple[
-    Dict[str, float],
-    Dict[str, float],
-    List[Dict[str, Any]],
-    Optional[Dict[str, Any]],
+
+    morph_updated_at = _isoformat(written_at)
+    morphs: List[Dict[str, Any]] = []
+    for morph_id in sorted(morph_map):
+        data = morph_map[morph_id]
+        morph_item: Dict[str, Any] = {"id": morph_id}
+        backend_key = definition_backend_keys.get(morph_id)
+        if backend_key:
+            morph_item["backendKey"] = backend_key
+        if data["slider_value"] is not None:
+            morph_item["sliderValue"] = data["slider_value"]
+            morph_item["value"] = data["slider_value"]
+        if data["unreal_value"] is not None:
+            morph_item["unrealValue"] = data["unreal_value"]
+        morph_item["updatedAt"] = morph_updated_at
+        morphs.append(morph_item)
+
+    return basic, body, morphs, written_quick_mode_settings
+
+
+def _fetch_measurements_bulk(
+    conn, avatar_ids: Sequence[uuid.UUID]
+) -> Dict[
+    uuid.UUID,
+    Tuple[
+        Dict[str, float],
+        Dict[str, float],
+        List[Dict[str, Any]],
+        Optional[Dict[str, Any]],
+    ],
 ]:
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            "SELECT measurement_key, value FROM avatar_basic_measurements WHERE avatar_id = %s",
-            (avatar_id,),
-        )
-        basic = {row["measurement_key"]: float(row["value"]) for row in cur.fetchall()}
+    """Load measurements, morphs and quick mode settings for several avatars at once."""
 
-        cur.execute(
-            "SELECT measurement_key, value FROM avatar_body_measurements WHERE avatar_id = %s",
-            (avatar_id,),
-        )
-        body = {row["measurement_key"]: float(row["value"]) for row in cur.fetchall()}
+    ids = list(avatar_ids)
+    if not ids:
+        return {}
 
-        cur.execute(
-            """
-            SELECT
-                amt.morph_id,
-                amt.backend_key,
-                amt.slider_value,
-                amt.unreal_value,
-                amt.updated_at,
-                md.backend_key AS definition_backend_key
-            FROM avatar_morph_targets AS amt
-            LEFT JOIN morph_definitions AS md ON md.id = amt.morph_id
-            WHERE amt.avatar_id = %s
-            """,
-            (avatar_id,),
-        )
+    with conn.cursor(cursor_factory=RealDictCursor) as cur:
+        cur.execute("EXECUTE fetch_measurements (%s::uuid[])", (ids,))
+        rows = cur.fetchall()
+
+    results = {}
+    for row in rows:
+        basic = {key: float(value) for key, value in (row["basic"] or {}).items()}
+        body = {key: float(value) for key, value in (row["body"] or {}).items()}
         morphs: List[Dict[str, Any]] = []
-        for row in cur.fetchall():
-            slider_value = row.get("slider_value")
-            unreal_value = row.get("unreal_value")
-            backend_key = row.get("backend_key") or row.get("definition_backend_key")
-            updated_at = row.get("updated_at")
-            morph_item: Dict[str, Any] = {"id": row["morph_id"]}
-            if backend_key:
-                morph_item["backendKey"] = backend_key
+        for morph in row["morphs"] or []:
+            slider_value = morph.get("sliderValue")
+            unreal_value = morph.get("unrealValue")
+            updated_at = _coerce_datetime(morph.get("updatedAt"))
+            morph_item: Dict[str, Any] = {"id": morph["id"]}
+            if morph.get("backendKey"):
+                morph_item["backendKey"] = morph["backendKey"]
             if slider_value is not None:
                 morph_item["sliderValue"] = float(slider_value)
                 morph_item["value"] = float(slider_value)
             if unreal_value is not None:
                 morph_item["unrealValue"] = float(unreal_value)
-            if isinstance(updated_at, datetime):
+            if updated_at is not None:
                 morph_item["updatedAt"] = _isoformat(updated_at)
             morphs.append(morph_item)
-
-        cur.execute(
-            """
-            SELECT body_shape, athletic_level, measurements, updated_at
-            FROM avatar_quickmode_settings
-            WHERE avatar_id = %s
-            """,
-            (avatar_id,),
+        results[row["avatar_id"]] = (
+            basic,
+            body,
+            morphs,
+            _quick_row_to_settings(row["quick_mode_settings"]),
         )
-        quick_row = cur.fetchone()
-
-    quick_mode_settings: Optional[Dict[str, Any]] = None
-    if quick_row:
-        body_shape = quick_row.get("body_shape")
-        athletic_level = quick_row.get("athletic_level")
-        measurements_value = quick_row.get("measurements") or {}
-        normalized_measurements: Dict[str, Any] = {}
-        if isinstance(measurements_value, dict):
-            for key, value in measurements_value.items():
-                if isinstance(value, (int, float)):
-                    normalized_measurements[str(key)] = float(value)
-                else:
-                    normalized_measurements[str(key)] = value
-        updated_at = quick_row.get("updated_at")
-        quick_mode_settings = {
-            "bodyShape": body_shape,
-            "athleticLevel": athletic_level,
-            "measurements": normalized_measurements,
-        }
-        if isinstance(updated_at, datetime):
-            quick_mode_settings["updatedAt"] = _isoformat(updated_at)
-        if not any(quick_mode_settings.values()):
-            quick_mode_settings = None
+    return results
+
 
-    morphs.sort(key=lambda item: item["id"])
-    return basic, body, morphs, quick_mode_settings
+def _quick_row_to_settings(quick_row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not quick_row:
+        return None
+
+    body_shape = quick_row.get("body_shape")
+    athletic_level = quick_row.get("athletic_level")
+    measurements_value = quick_row.get("measurements") or {}
+    normalized_measurements: Dict[str, Any] = {}
+    if isinstance(measurements_value, dict):
+        for key, value in measurements_value.items():
+            if isinstance(value, (int, float)):
+                normalized_measurements[str(key)] = float(value)
+            else:
+                normalized_measurements[str(key)] = value
+    updated_at = _coerce_datetime(quick_row.get("updated_at"))
+    quick_mode_settings: Optional[Dict[str, Any]] = {
+        "bodyShape": body_shape,
+        "athleticLevel": athletic_level,
+        "measurements": normalized_measurements,
+    }
+    if updated_at is not None:
+        quick_mode_settings["updatedAt"] = _isoformat(updated_at)
+    if not any(quick_mode_settings.values()):
+        quick_mode_settings = None
+    return quick_mode_settings
+
+
+def _fetch_measurements(
+    conn, avatar_id: uuid.UUID
+) -> Tuple[
+    Dict[str, float],
+    Dict[str, float],
+    List[Dict[str, Any]],
+    Optional[Dict[str, Any]],
+]:
+    return _fetch_measurements_bulk(conn, [avatar_id])[avatar_id]
 
 
 def _row_to_avatar(
@@ -422,19 +635,18 @@ def _row_to_avatar(
 ) -> Dict[str, object]:
     created_at = row["created_at"] if isinstance(row["created_at"], datetime) else None
     updated_at = row["updated_at"] if isinstance(row["updated_at"], datetime) else None
-    quick_mode_flag = bool(row.get("quick_mode")) if row.get("quick_mode") is not None else False
-    if quick_mode_settings:
-        quick_mode_flag = quick_mode_flag or True
+    # Every caller selects the full avatar column list, so subscripts are safe.
+    quick_mode_flag = bool(row["quick_mode"]) or bool(quick_mode_settings)
     return {
         "id": str(row["id"]),
         "userId": row["user_id"],
         "name": row["name"],
-        "gender": row.get("gender"),
-        "ageRange": row.get("age_range"),
-        "creationMode": row.get("creation_mode"),
-        "source": row.get("source"),
+        "gender": row["gender"],
+        "ageRange": row["age_range"],
+        "creationMode": row["creation_mode"],
+        "source": row["source"],
         "quickMode": quick_mode_flag,
-        "createdBySession": row.get("created_by_session"),
+        "createdBySession": row["created_by_session"],
         "basicMeasurements": basic,
         "bodyMeasurements": body,
         "morphTargets": morphs,
@@ -472,18 +684,24 @@ def list_avatars(
                     quick_mode,
                     created_by_session,
                     created_at,
-                    updated_at
+                    updated_at,
+                    COUNT(*) OVER () AS total
                 FROM avatars
                 WHERE user_id = %s
                 ORDER BY created_at, id
+                LIMIT %s
                 """,
-                (user_id,),
+                (user_id, limit),
             )
             rows = cur.fetchall()
 
+        # The window count is evaluated before LIMIT, so it still covers every avatar.
+        total = rows[0]["total"] if rows else 0
+        measurements = _fetch_measurements_bulk(conn, [row["id"] for row in rows])
+
         items: List[Dict[str, object]] = []
-        for row in rows[:limit]:
-            basic, body, morphs, quick_mode_settings = _fetch_measurements(conn, row["id"])
+        for row in rows:
+            basic, body, morphs, quick_mode_settings = measurements[row["id"]]
             items.append(
                 _row_to_avatar(
                     row,
@@ -498,13 +716,13 @@ def list_avatars(
             "userId": user_id,
             "limit": limit,
             "count": len(items),
-            "total": len(rows),
+            "total": total,
             "items": items,
         }
 
 
 def get_avatar(user_id: str, avatar_id: str) -> Dict[str, object]:
-    avatar_uuid = uuid.UUID(avatar_id)
+    avatar_uuid = _parse_uuid(avatar_id)
 
     with _connection() as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
@@ -542,6 +760,57 @@ def get_avatar(user_id: str, avatar_id: str) -> Dict[str, object]:
         )
 
 
+def get_avatars_bulk(user_id: str, avatar_ids: Sequence[str]) -> List[Dict[str, object]]:
+    """Return the requested avatars owned by ``user_id`` in the order they were asked for.
+
+    Unknown identifiers are skipped; malformed ones raise ``ValueError``.
+    """
+
+    avatar_uuids = list(dict.fromkeys(_parse_uuid(avatar_id) for avatar_id in avatar_ids))
+    if not avatar_uuids:
+        return []
+
+    with _connection() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT
+                    id,
+                    user_id,
+                    name,
+                    gender,
+                    age_range,
+                    creation_mode,
+                    source,
+                    quick_mode,
+                    created_by_session,
+                    created_at,
+                    updated_at
+                FROM avatars
+                WHERE user_id = %s AND id = ANY(%s::uuid[])
+                """,
+                (user_id, avatar_uuids),
+            )
+            rows = {row["id"]: row for row in cur.fetchall()}
+
+        found = [avatar_uuid for avatar_uuid in avatar_uuids if avatar_uuid in rows]
+        measurements = _fetch_measurements_bulk(conn, found)
+
+        items: List[Dict[str, object]] = []
+        for avatar_uuid in found:
+            basic, body, morphs, quick_mode_settings = measurements[avatar_uuid]
+            items.append(
+                _row_to_avatar(
+                    rows[avatar_uuid],
+                    basic=basic,
+                    body=body,
+                    morphs=morphs,
+                    quick_mode_settings=quick_mode_settings,
+                )
+            )
+        return items
+
+
 def create_avatar(
     user_id: str,
     *,
@@ -559,65 +828,93 @@ def create_avatar(
     quick_mode_settings_is_set: bool = False,
     user_context: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, object]:
-    avatar_uuid = uuid.uuid4()
+    avatar_uuid = _new_uuid()
 
     with _connection() as conn:
         _ensure_user(conn, user_id, user_context=user_context)
-        slot = _find_available_slot(conn, user_id)
         avatar_name = name.strip() if name.strip() else "Untitled Avatar"
 
-        try:
-            with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute(
-                    """
-                    INSERT INTO avatars (
-                        id,
-                        user_id,
-                        name,
-                        slot,
-                        gender,
-                        age_range,
-                        creation_mode,
-                        source,
-                        quick_mode,
-                        created_by_session
+        row = None
+        # The statement always returns one row: free_slots tells a full quota
+        # (0) apart from a slot claimed by a concurrent create between the NOT
+        # EXISTS check and the insert, where ON CONFLICT skips and we retry once.
+        for _attempt in range(2):
+            try:
+                with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                    cur.execute(
+                        """
+                        WITH free_slot AS (
+                            SELECT s.slot
+                            FROM generate_series(1, 5) AS s(slot)
+                            WHERE NOT EXISTS (
+                                SELECT 1 FROM avatars WHERE user_id = %s AND slot = s.slot
+                            )
+                            ORDER BY s.slot
+                            LIMIT 1
+                        ),
+                        inserted AS (
+                            INSERT INTO avatars (
+                                id,
+                                user_id,
+                                name,
+                                slot,
+                                gender,
+                                age_range,
+                                creation_mode,
+                                source,
+                                quick_mode,
+                                created_by_session
+                            )
+                            SELECT %s, %s, %s, slot, %s, %s, %s, %s, %s, %s
+                            FROM free_slot
+                            ON CONFLICT ON CONSTRAINT avatars_user_id_slot_key DO NOTHING
+                            RETURNING
+                                id,
+                                user_id,
+                                name,
+                                gender,
+                                age_range,
+                                creation_mode,
+                                source,
+                                quick_mode,
+                                created_by_session,
+                                created_at,
+                                updated_at
+                        )
+                        SELECT inserted.*, f.free_slots
+                        FROM (SELECT count(*) AS free_slots FROM free_slot) AS f
+                        LEFT JOIN inserted ON TRUE
+                        """,
+                        (
+                            user_id,
+                            avatar_uuid,
+                            user_id,
+                            avatar_name,
+                            gender,
+                            age_range,
+                            creation_mode,
+                            source,
+                            quick_mode,
+                            created_by_session,
+                        ),
                     )
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING
-                        id,
-                        user_id,
-                        name,
-                        gender,
-                        age_range,
-                        creation_mode,
-                        source,
-                        quick_mode,
-                        created_by_session,
-                        created_at,
-                        updated_at
-                    """,
-                    (
-                        avatar_uuid,
-                        user_id,
-                        avatar_name,
-                        slot,
-                        gender,
-                        age_range,
-                        creation_mode,
-                        source,
-                        quick_mode,
-                        created_by_session,
-                    ),
-                )
-                row = cur.fetchone()
-        except errors.UniqueViolation as exc:
-            if exc.diag and exc.diag.constraint_name == "avatars_user_id_name_key":
-                raise DuplicateAvatarNameError(
-                    "Avatar name must be unique per user."
-                ) from exc
-            raise
+                    result = cur.fetchone()
+            except errors.UniqueViolation as exc:
+                if exc.diag and exc.diag.constraint_name == "avatars_user_id_name_key":
+                    raise DuplicateAvatarNameError(
+                        "Avatar name must be unique per user."
+                    ) from exc
+                raise
+            if result["id"] is not None:
+                row = result
+                break
+            if not result["free_slots"]:
+                break
+
+        if row is None:
+            raise AvatarQuotaExceededError("User has reached the maximum of five avatars.")
 
-        _persist_measurements(
+        basic, body, morphs, quick_mode_data = _persist_measurements(
             conn,
             avatar_uuid,
             basic=basic_measurements,
@@ -625,9 +922,8 @@ def create_avatar(
             morph_targets=morph_targets,
             quick_mode_settings=quick_mode_settings,
             quick_mode_settings_is_set=quick_mode_settings_is_set,
+            written_at=row["updated_at"],
         )
-
-        basic, body, morphs, quick_mode_data = _fetch_measurements(conn, avatar_uuid)
         return _row_to_avatar(
             row,
             basic=basic,
@@ -655,20 +951,10 @@ def update_avatar(
     quick_mode_settings_is_set: bool = False,
     user_context: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, object]:
-    avatar_uuid = uuid.UUID(avatar_id)
+    avatar_uuid = _parse_uuid(avatar_id)
 
     with _connection() as conn:
         _ensure_user(conn, user_id, user_context=user_context)
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(
-                "SELECT id, user_id, name, slot FROM avatars WHERE id = %s AND user_id = %s",
-                (avatar_uuid, user_id),
-            )
-            row = cur.fetchone()
-
-        if row is None:
-            raise AvatarNotFoundError("Avatar not found.")
-
         avatar_name = name.strip() if name.strip() else "Untitled Avatar"
 
         try:
@@ -685,7 +971,7 @@ def update_avatar(
                         quick_mode = %s,
                         created_by_session = %s,
                         updated_at = NOW()
-                    WHERE id = %s
+                    WHERE id = %s AND user_id = %s
                     RETURNING
                         id,
                         user_id,
@@ -697,7 +983,20 @@ def update_avatar(
                         quick_mode,
                         created_by_session,
                         created_at,
-                        updated_at
+                        updated_at,
+                        (
+                            SELECT json_build_object(
+                                'body_shape', q.body_shape,
+                                'athletic_level', q.athletic_level,
+                                'measurements', q.measurements,
+                                'updated_at', to_char(
+                                    q.updated_at AT TIME ZONE 'UTC',
+                                    'YYYY-MM-DD"T"HH24:MI:SS.US"Z"'
+                                )
+                            )
+                            FROM avatar_quickmode_settings AS q
+                            WHERE q.avatar_id = avatars.id
+                        ) AS quick_mode_settings
                     """,
                     (
                         avatar_name,
@@ -708,6 +1007,7 @@ def update_avatar(
                         quick_mode,
                         created_by_session,
                         avatar_uuid,
+                        user_id,
                     ),
                 )
                 updated = cur.fetchone()
@@ -718,7 +1018,11 @@ def update_avatar(
                 ) from exc
             raise
 
-        _persist_measurements(
+        # The ownership check lives in the WHERE clause; no row means no match.
+        if updated is None:
+            raise AvatarNotFoundError("Avatar not found.")
+
+        basic, body, morphs, quick_mode_data = _persist_measurements(
             conn,
             avatar_uuid,
             basic=basic_measurements,
@@ -726,9 +1030,11 @@ def update_avatar(
             morph_targets=morph_targets,
             quick_mode_settings=quick_mode_settings,
             quick_mode_settings_is_set=quick_mode_settings_is_set,
+            written_at=updated["updated_at"],
         )
-
-        basic, body, morphs, quick_mode_data = _fetch_measurements(conn, avatar_uuid)
+        if not quick_mode_settings_is_set:
+            # Untouched settings come back from the UPDATE's RETURNING subquery.
+            quick_mode_data = _quick_row_to_settings(updated["quick_mode_settings"])
         return _row_to_avatar(
             updated,
             basic=basic,
@@ -738,7 +1044,7 @@ def update_avatar(
         )
 
 def delete_avatar(user_id: str, avatar_id: str) -> None:
-    avatar_uuid = uuid.UUID(avatar_id)
+    avatar_uuid = _parse_uuid(avatar_id)
 
     with _connection() as conn:
         with conn.cursor() as cur:
@@ -1,13 +1,13 @@
 """Blueprint with endpoints for managing avatar configurations."""
 from __future__ import annotations
 
-from collections.abc import Iterable as IterableABC
 from datetime import datetime, timezone
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
-from flask import Blueprint, abort, jsonify, request
+import orjson
+from flask import Blueprint, Response, abort, request
 
-from auth import authenticate_request, current_user_context, require_user_access
+from auth import authenticate_request
 
 from . import repository
 from .repository import (
@@ -23,7 +23,7 @@ avatar_bp = Blueprint("avatar", __name__, url_prefix="/api")
 # Maximum number of avatars returned from list endpoint.
 _LIST_LIMIT = 5
 
-_ALLOWED_GENDERS = {"female", "male", "non_binary", "unspecified"}
+_ALLOWED_GENDERS = frozenset({"female", "male", "non_binary", "unspecified"})
 _AGE_RANGE_UI_LABELS = [
     "15-19",
     "20-29",
@@ -35,18 +35,38 @@ _AGE_RANGE_UI_LABELS = [
     "80-89",
     "90-99",
 ]
-_ALLOWED_AGE_RANGES = {
-    "child",
-    "teen",
-    "young_adult",
-    "adult",
-    "mature",
-    "senior",
-    *{label.lower() for label in _AGE_RANGE_UI_LABELS},
+_ALLOWED_AGE_RANGES = frozenset(
+    {
+        "child",
+        "teen",
+        "young_adult",
+        "adult",
+        "mature",
+        "senior",
+        *{label.lower() for label in _AGE_RANGE_UI_LABELS},
+    }
+)
+_ALLOWED_CREATION_MODES = frozenset({"manual", "scan", "preset", "import"})
+_ALLOWED_SOURCES = frozenset({"web", "ios", "android", "kiosk", "api", "integration"})
+_MEASUREMENT_STATUS_KEYS = frozenset({"creationMode"})
+_NUMERIC_TYPES = frozenset({int, float})
+_QUICK_MODE_SETTINGS_KEYS = frozenset({"bodyShape", "athleticLevel", "measurements", "updatedAt"})
+
+# Error messages shared by several validation paths and routes.
+_ERR_JSON_BODY_REQUIRED = "Request body must contain JSON data."
+_ERR_PAYLOAD_NOT_OBJECT = "Request payload must be a JSON object."
+_ERR_INVALID_AVATAR_ID = "Avatar identifier is invalid."
+
+# Error messages for enum fields, built once instead of on every failed request.
+_ENUM_ERRORS = {
+    field: f"{field} must be one of: {', '.join(sorted(allowed))}."
+    for field, allowed in (
+        ("gender", _ALLOWED_GENDERS),
+        ("ageRange", _ALLOWED_AGE_RANGES),
+        ("creationMode", _ALLOWED_CREATION_MODES),
+        ("source", _ALLOWED_SOURCES),
+    )
 }
-_ALLOWED_CREATION_MODES = {"manual", "scan", "preset", "import"}
-_ALLOWED_SOURCES = {"web", "ios", "android", "kiosk", "api", "integration"}
-_MEASUREMENT_STATUS_KEYS = {"creationMode"}
 
 # ---------------------------------------------------------------------------
 # Authentication hooks
@@ -55,16 +75,17 @@ _MEASUREMENT_STATUS_KEYS = {"creationMode"}
 
 @avatar_bp.before_request
 def _enforce_authentication():
-    """Ensure requests hitting the avatar blueprint are authenticated."""
+    """Authenticate the request and restrict it to the caller's own ``user_id``."""
 
     if request.method == "OPTIONS":
         # Allow CORS preflight requests to pass without authentication.
         return None
 
-    # TODO: Temporarily disable for testing, we'll re-enable later.
-    return None    
-
-    # authenticate_request()
+    authenticated_user = authenticate_request()
+    user_id = (request.view_args or {}).get("user_id")
+    if user_id is not None and authenticated_user != user_id:
+        abort(403, description="You are not allowed to access resources for another user.")
+    return None
 
 
 # ---------------------------------------------------------------------------
@@ -72,7 +93,26 @@ def _enforce_authentication():
 # ---------------------------------------------------------------------------
 
 
-def _normalize_enum(value: Optional[Any], *, field: str, allowed: set[str]) -> Optional[str]:
+def _load_json() -> Any:
+    """Parse the raw request body with orjson, skipping Flask's ``get_json`` machinery."""
+
+    # Like get_json, reject bodies not sent as JSON, such as form posts or text/plain.
+    if not request.is_json:
+        abort(400, description=_ERR_JSON_BODY_REQUIRED)
+    try:
+        return orjson.loads(request.get_data(cache=False))
+    except orjson.JSONDecodeError:
+        abort(400, description=_ERR_JSON_BODY_REQUIRED)
+
+
+def _json_response(obj: Any, status: int = 200) -> Response:
+    # Response sets Content-Length from the bytes body, so no chunked encoding is used.
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+
+def _normalize_enum(
+    value: Optional[Any], *, field: str, allowed: frozenset[str]
+) -> Optional[str]:
     if value is None:
         return None
     if not isinstance(value, str):
@@ -81,8 +121,7 @@ def _normalize_enum(value: Optional[Any], *, field: str, allowed: set[str]) -> O
     if not normalized:
         return None
     if normalized not in allowed:
-        allowed_values = ", ".join(sorted(allowed))
-        abort(400, description=f"{field} must be one of: {allowed_values}.")
+        abort(400, description=_ENUM_ERRORS[field])
     return normalized
 
 
@@ -145,6 +184,12 @@ def _normalize_measurements(
     if not isinstance(section, dict):
         abort(400, description=f"{section_name} must be an object of numeric values.")
 
+    # Fast path for the common payload: string keys, plain numbers, no status keys.
+    if _MEASUREMENT_STATUS_KEYS.isdisjoint(section) and all(
+        type(key) is str and type(value) in _NUMERIC_TYPES for key, value in section.items()
+    ):
+        return {key: float(value) for key, value in section.items()}, {}
+
     normalized: Dict[str, float] = {}
     statuses: Dict[str, Optional[str]] = {}
     for key, value in section.items():
@@ -156,9 +201,15 @@ def _normalize_measurements(
                 if normalized_status is not None:
                     statuses[key] = normalized_status
             continue
-        if not isinstance(value, (int, float)):
+        value_type = type(value)
+        if value_type is float:
+            normalized[key] = value
+        elif value_type is int:
+            normalized[key] = float(value)
+        elif value_type is bool or not isinstance(value, (int, float)):
             abort(400, description=f"Measurement '{key}' in {section_name} must be a number.")
-        normalized[key] = float(value)
+        else:
+            normalized[key] = float(value)
     return normalized, statuses
 
 
@@ -168,8 +219,7 @@ def _normalize_quick_mode_settings(payload: Optional[Any]) -> Optional[Dict[str,
     if not isinstance(payload, dict):
         abort(400, description="quickModeSettings must be an object.")
 
-    allowed_keys = {"bodyShape", "athleticLevel", "measurements", "updatedAt"}
-    unexpected = [key for key in payload.keys() if key not in allowed_keys]
+    unexpected = payload.keys() - _QUICK_MODE_SETTINGS_KEYS
     if unexpected:
         joined = ", ".join(sorted(unexpected))
         abort(400, description=f"quickModeSettings contains unsupported fields: {joined}.")
@@ -271,32 +321,44 @@ def _normalize_morph_entry(morph_id: Any, raw_value: Any) -> Dict[str, Any]:
 def _normalize_morph_targets(payload: Any) -> List[Dict[str, Any]]:
     if payload is None:
         return []
-    items: List[Dict[str, Any]] = []
-    if isinstance(payload, dict):
-        for morph_id, value in payload.items():
-            items.append(_normalize_morph_entry(morph_id, value))
-    elif isinstance(payload, IterableABC) and not isinstance(payload, (str, bytes)):
-        for entry in payload:
-            if isinstance(entry, dict):
-                morph_id = entry.get("id")
-                if morph_id is None:
-                    abort(400, description="Morph targets must include an 'id'.")
-                value: Any = entry
-            elif isinstance(entry, (list, tuple)) and len(entry) == 2:
-                morph_id, value = entry
-            else:
-                abort(
-                    400,
-                    description="Morph targets must be provided as objects with id/value data.",
-                )
-            items.append(_normalize_morph_entry(morph_id, value))
+    is_mapping = isinstance(payload, dict)
+    if is_mapping:
+        entries: Iterable[Any] = payload.items()
+    elif isinstance(payload, list):
+        entries = payload
     else:
         abort(400, description="Morph targets must be provided as an object or list of objects.")
+
+    # Normalize, de-duplicate (last write wins) and check ordering in one pass.
     collapsed: Dict[str, Dict[str, Any]] = {}
-    for item in items:
-        collapsed[item["id"]] = item
+    previous_id = ""
+    in_order = True
+    for entry in entries:
+        if is_mapping:
+            morph_id, value = entry
+        elif isinstance(entry, dict):
+            morph_id = entry.get("id")
+            if morph_id is None:
+                abort(400, description="Morph targets must include an 'id'.")
+            value = entry
+        elif isinstance(entry, (list, tuple)) and len(entry) == 2:
+            morph_id, value = entry
+        else:
+            abort(
+                400,
+                description="Morph targets must be provided as objects with id/value data.",
+            )
+        item = _normalize_morph_entry(morph_id, value)
+        item_id = item["id"]
+        if item_id <= previous_id:
+            in_order = False
+        previous_id = item_id
+        collapsed[item_id] = item
 
-    return [collapsed[key] for key in sorted(collapsed.keys())]
+    # Clients usually send ids already sorted and unique, which needs no sort.
+    if in_order:
+        return list(collapsed.values())
+    return [collapsed[key] for key in sorted(collapsed)]
 
 
 def _apply_payload(
@@ -307,7 +369,7 @@ def _apply_payload(
     user_context: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Any]:
     if not isinstance(payload, dict):
-        abort(400, description="Request payload must be a JSON object.")
+        abort(400, description=_ERR_PAYLOAD_NOT_OBJECT)
 
     name = payload.get("name")
     if name is not None and not isinstance(name, str):
@@ -336,12 +398,19 @@ def _apply_payload(
         payload.get("createdBySession"), field="createdBySession"
     )
 
-    basic_measurements, basic_statuses = _normalize_measurements(
-        payload.get("basicMeasurements"), section_name="basicMeasurements"
-    )
-    body_measurements, body_statuses = _normalize_measurements(
-        payload.get("bodyMeasurements"), section_name="bodyMeasurements"
-    )
+    # Name-only updates omit these sections; skip the helper calls entirely.
+    if "basicMeasurements" in payload:
+        basic_measurements, basic_statuses = _normalize_measurements(
+            payload["basicMeasurements"], section_name="basicMeasurements"
+        )
+    else:
+        basic_measurements, basic_statuses = {}, {}
+    if "bodyMeasurements" in payload:
+        body_measurements, body_statuses = _normalize_measurements(
+            payload["bodyMeasurements"], section_name="bodyMeasurements"
+        )
+    else:
+        body_measurements, body_statuses = {}, {}
 
     basic_statuses = {k: v for k, v in basic_statuses.items() if v is not None}
     body_statuses = {k: v for k, v in body_statuses.items() if v is not None}
@@ -358,7 +427,10 @@ def _apply_payload(
             )
         creation_mode = measurement_creation_mode
 
-    morph_targets = _normalize_morph_targets(payload.get("morphTargets"))
+    if "morphTargets" in payload:
+        morph_targets = _normalize_morph_targets(payload["morphTargets"])
+    else:
+        morph_targets = []
 
     avatar_name = name if isinstance(name, str) else ""
 
@@ -405,17 +477,9 @@ def _apply_payload(
     except AvatarNotFoundError as exc:
         abort(404, description=str(exc))
     except ValueError:
-        abort(400, description="Avatar identifier is invalid.")
+        abort(400, description=_ERR_INVALID_AVATAR_ID)
     return avatar
 
-def _require_user_scope(user_id: str) -> None:
-    """Abort the request when the authenticated user differs from ``user_id``."""
-
-    # TODO: Temporarily disable for testing, we'll re-enable later.
-    return None
-    
-    # require_user_access(user_id)
-
 
 # ---------------------------------------------------------------------------
 # Routes
@@ -424,50 +488,69 @@ def _require_user_scope(user_id: str) -> None:
 
 @avatar_bp.route("/users/<user_id>/avatars", methods=["GET"])
 def list_avatars(user_id: str):
-    _require_user_scope(user_id)
-    # TODO: Temporarily disable for testing, we'll re-enable later.
-    user_context = None  # current_user_context()
+    # User-context persistence stays off; _ensure_user only creates the user row.
+    user_context = None
     response = repository.list_avatars(
         user_id,
         limit=_LIST_LIMIT,
         user_context=user_context,
     )
-    return jsonify(response)
+    return _json_response(response)
 
 
 @avatar_bp.route("/users/<user_id>/avatars", methods=["POST"])
 def create_avatar(user_id: str):
-    _require_user_scope(user_id)
-    # TODO: Temporarily disable for testing, we'll re-enable later.
-    user_context = None  # current_user_context()
-    payload = request.get_json(silent=True)
+    # User-context persistence stays off; _ensure_user only creates the user row.
+    user_context = None
+    payload = _load_json()
     if payload is None:
-        abort(400, description="Request body must contain JSON data.")
+        abort(400, description=_ERR_JSON_BODY_REQUIRED)
 
     avatar = _apply_payload(user_id, payload, user_context=user_context)
-    return jsonify(avatar), 201
+    return _json_response(avatar, 201)
 
 
 @avatar_bp.route("/users/<user_id>/avatars/<avatar_id>", methods=["GET"])
 def get_avatar(user_id: str, avatar_id: str):
-    # _require_user_scope(user_id)  # TEMPORARILY DISABLED FOR TESTING
     try:
         avatar = repository.get_avatar(user_id, avatar_id)
     except AvatarNotFoundError as exc:
         abort(404, description=str(exc))
     except ValueError:
-        abort(400, description="Avatar identifier is invalid.")
-    return jsonify(avatar)
+        abort(400, description=_ERR_INVALID_AVATAR_ID)
+    return _json_response(avatar)
+
+
+@avatar_bp.route("/users/<user_id>/avatars:batch", methods=["POST"])
+def batch_get_avatars(user_id: str):
+    """Return several avatars in one call instead of a list followed by per-id GETs."""
+
+    payload = _load_json()
+    if not isinstance(payload, dict):
+        abort(400, description=_ERR_JSON_BODY_REQUIRED)
+
+    avatar_ids = payload.get("ids")
+    if not isinstance(avatar_ids, list) or not all(
+        isinstance(avatar_id, str) for avatar_id in avatar_ids
+    ):
+        abort(400, description="'ids' must be a list of avatar identifier strings.")
+    if len(avatar_ids) > _LIST_LIMIT:
+        abort(400, description=f"At most {_LIST_LIMIT} avatars can be requested at once.")
+
+    try:
+        items = repository.get_avatars_bulk(user_id, avatar_ids)
+    except ValueError:
+        abort(400, description=_ERR_INVALID_AVATAR_ID)
+    return _json_response({"userId": user_id, "count": len(items), "items": items})
 
 
 @avatar_bp.route("/users/<user_id>/avatars/<avatar_id>", methods=["PUT"])
 def update_avatar(user_id: str, avatar_id: str):
-    _require_user_scope(user_id)
-    # TODO: Temporarily disable for testing, we'll re-enable later.
-    user_context = None  # current_user_context()
-    payload = request.get_json(silent=True)
+    # User-context persistence stays off; _ensure_user only creates the user row.
+    user_context = None
+    payload = _load_json()
     if payload is None:
-        abort(400, description="Request body must contain JSON data.")
+        abort(400, description=_ERR_JSON_BODY_REQUIRED)
 
     avatar = _apply_payload(
         user_id,
@@ -475,16 +558,15 @@ def update_avatar(user_id: str, avatar_id: str):
         avatar_id=avatar_id,
         user_context=user_context,
     )
-    return jsonify(avatar)
+    return _json_response(avatar)
 
 
 @avatar_bp.route("/users/<user_id>/avatars/<avatar_id>", methods=["DELETE"])
 def delete_avatar(user_id: str, avatar_id: str):
-    # _require_user_scope(user_id)  # TEMPORARILY DISABLED FOR TESTING
     try:
         repository.delete_avatar(user_id, avatar_id)
     except AvatarNotFoundError as exc:
         abort(404, description=str(exc))
     except ValueError:
-        abort(400, description="Avatar identifier is invalid.")
+        abort(400, description=_ERR_INVALID_AVATAR_ID)
     return "", 204
\ No newline at end of file
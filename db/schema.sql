@@ -113,6 +113,10 @@ CREATE INDEX IF NOT EXISTS avatar_body_measurements_avatar_id_idx
 CREATE INDEX IF NOT EXISTS avatar_morph_targets_avatar_id_idx
     ON avatar_morph_targets (avatar_id);
 
+-- (listanje avatara po redoslijedu kreiranja)
+CREATE INDEX IF NOT EXISTS avatars_user_id_created_at_idx
+    ON avatars (user_id, created_at, id);
+
 -- (za često filtriraš po backend_key)
 CREATE INDEX IF NOT EXISTS avatar_morph_targets_backend_key_idx
     ON avatar_morph_targets (backend_key);
@@ -0,0 +1,25 @@
+"""Gunicorn configuration for the Fitspace backend.
+
+Run with ``gunicorn -c gunicorn.conf.py app:app``.
+"""
+import os
+
+# Every avatar request waits on PostgreSQL round-trips, so cooperative gevent
+# workers serve many requests concurrently instead of one at a time. app.py
+# reads GEVENT to make psycopg2 cooperative before importing it.
+os.environ.setdefault("GEVENT", "1")
+
+bind = "0.0.0.0:8080"
+workers = int(os.getenv("WEB_CONCURRENCY", (os.cpu_count() or 1) * 2 + 1))
+worker_class = "gevent"
+worker_connections = 1000
+keepalive = 5
+
+# No preload_app: the gevent worker monkey-patches the standard library when
+# it boots, and the app must be imported after that. Preloading would import
+# it in the unpatched master, which gevent warns is unsafe.
+preload_app = False
+
+# Recycle workers periodically; the jitter keeps them from restarting together.
+max_requests = 1000
+max_requests_jitter = 100
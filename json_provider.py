@@ -0,0 +1,41 @@
+"""JSON provider backed by orjson for faster request and response handling."""
+from __future__ import annotations
+
+import decimal
+from typing import Any
+
+import orjson
+from flask.json.provider import JSONProvider
+
+
+def _default(obj: Any) -> Any:
+    # orjson already handles datetime, date, UUID and dataclasses natively.
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrJSONProvider(JSONProvider):
+    """Serialize ``jsonify`` responses and parse ``request.json`` with orjson."""
+
+    sort_keys = False
+    compact = True
+
+    def _options(self) -> int:
+        option = orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if not self.compact:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj, default=_default, option=self._options()).decode("utf-8")
+
+    def loads(self, s: str | bytes, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options())
+        return self._app.response_class(body, mimetype="application/json")
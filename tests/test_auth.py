@@ -0,0 +1,127 @@
+import time
+import unittest
+from unittest.mock import patch
+
+import jwt
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+
+import auth
+
+
+class DecodeTokenCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["JWT_SECRET"] = "test-secret"
+        auth.init_app(self.app)
+        auth._token_cache.clear()
+        self.addCleanup(auth._token_cache.clear)
+
+    def _token(self, **claims):
+        payload = {"sub": "user-123", "exp": int(time.time()) + 600, **claims}
+        return jwt.encode(payload, "test-secret", algorithm="HS256")
+
+    def test_valid_token_is_decoded_once(self):
+        token = self._token()
+
+        with self.app.app_context(), patch.object(
+            auth._pyjwt, "decode", wraps=auth._pyjwt.decode
+        ) as mock_decode:
+            first = auth._decode_token(token)
+            second = auth._decode_token(token)
+
+        self.assertEqual(first["sub"], "user-123")
+        self.assertEqual(second, first)
+        self.assertEqual(mock_decode.call_count, 1)
+
+    def test_invalid_token_is_not_cached(self):
+        token = jwt.encode({"sub": "user-123"}, "other-secret", algorithm="HS256")
+
+        with self.app.app_context(), patch.object(
+            auth._pyjwt, "decode", wraps=auth._pyjwt.decode
+        ) as mock_decode:
+            for _ in range(2):
+                with self.assertRaises(HTTPException) as ctx:
+                    auth._decode_token(token)
+                self.assertEqual(ctx.exception.code, 401)
+
+        self.assertEqual(mock_decode.call_count, 2)
+        self.assertEqual(len(auth._token_cache), 0)
+
+    def test_expired_cached_token_is_rejected(self):
+        token = self._token()
+
+        with self.app.app_context():
+            auth._decode_token(token)
+            with patch("auth.time.time", return_value=time.time() + 3600), patch.object(
+                auth._pyjwt, "decode", side_effect=jwt.ExpiredSignatureError
+            ) as mock_decode:
+                with self.assertRaises(HTTPException) as ctx:
+                    auth._decode_token(token)
+
+        self.assertEqual(ctx.exception.code, 401)
+        mock_decode.assert_called_once()
+
+    def test_reinitialising_with_new_secret_drops_cached_claims(self):
+        token = self._token()
+
+        with self.app.app_context():
+            auth._decode_token(token)
+
+        other_app = Flask(__name__)
+        other_app.config["JWT_SECRET"] = "rotated-secret"
+        auth.init_app(other_app)
+
+        with other_app.app_context():
+            with self.assertRaises(HTTPException) as ctx:
+                auth._decode_token(token)
+
+        self.assertEqual(ctx.exception.code, 401)
+
+    def test_token_without_subject_is_rejected(self):
+        token = jwt.encode({"exp": int(time.time()) + 600}, "test-secret", algorithm="HS256")
+
+        with self.app.app_context():
+            with self.assertRaises(HTTPException) as ctx:
+                auth._decode_token(token)
+
+        self.assertEqual(ctx.exception.code, 401)
+        self.assertIn("sub", ctx.exception.description)
+
+    def test_token_with_empty_subject_is_rejected(self):
+        token = self._token(sub="")
+
+        with self.app.app_context():
+            with self.assertRaises(HTTPException) as ctx:
+                auth._decode_token(token)
+
+        self.assertEqual(ctx.exception.code, 401)
+        self.assertIn("subject", ctx.exception.description)
+        self.assertEqual(len(auth._token_cache), 0)
+
+
+class CreateTokenApiKeyTests(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config["JWT_SECRET"] = "test-secret"
+        self.app.config["AUTH_API_KEY"] = "expected-key"
+        auth.init_app(self.app)
+        self.app.register_blueprint(auth.auth_bp)
+        self.client = self.app.test_client()
+
+    def test_matching_api_key_issues_token(self):
+        response = self.client.post(
+            "/api/auth/token", json={"userId": "user-123", "apiKey": "expected-key"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["user"], {"id": "user-123"})
+
+    def test_wrong_or_missing_api_key_is_rejected(self):
+        for payload in ({"userId": "user-123", "apiKey": "wrong"}, {"userId": "user-123"}):
+            response = self.client.post("/api/auth/token", json=payload)
+            self.assertEqual(response.status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,439 @@
+import json
+import threading
+import time
+import unittest
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from flask import Flask
+from psycopg2.pool import PoolError
+
+from avatar import repository
+
+
+class _FakeConnection:
+    prepared = True
+    autocommit = True
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _FakePool:
+    """Mimics ThreadedConnectionPool: getconn fails instead of waiting when empty."""
+
+    def __init__(self, minconn, maxconn, **kwargs):
+        self.maxconn = maxconn
+        self.in_use = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def getconn(self):
+        with self._lock:
+            if self.in_use >= self.maxconn:
+                raise PoolError("connection pool exhausted")
+            self.in_use += 1
+            self.peak = max(self.peak, self.in_use)
+        return _FakeConnection()
+
+    def putconn(self, conn):
+        with self._lock:
+            self.in_use -= 1
+
+    def closeall(self):
+        pass
+
+
+class ConnectionPoolTests(unittest.TestCase):
+    def setUp(self):
+        patcher = patch("avatar.repository.ThreadedConnectionPool", _FakePool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, repository, "_pool_settings", None)
+        self.addCleanup(repository.close_pool)
+
+        app = Flask(__name__)
+        app.config.update(DATABASE_URL="postgresql://test", DB_POOL_MIN=1, DB_POOL_MAX=3)
+        repository.init_app(app)
+
+    def test_checkouts_beyond_maxconn_wait_for_a_free_connection(self):
+        errors = []
+
+        def worker():
+            try:
+                with repository._connection():
+                    time.sleep(0.02)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        pool, _ = repository._get_pool()
+        self.assertEqual(errors, [])
+        self.assertEqual(pool.peak, 3)
+        self.assertEqual(pool.in_use, 0)
+
+
+def _to_char_utc(value):
+    # to_char(value AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS.US"Z"')
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class _FakeDatabase:
+    """In-memory stand-in for the measurement tables behind ``_persist_measurements``.
+
+    Writes are recorded as PostgreSQL would store them, and ``EXECUTE
+    fetch_measurements`` is answered with the JSON the prepared statement builds.
+    """
+
+    def __init__(self, now):
+        self.now = now
+        self.basic = {}
+        self.body = {}
+        self.morphs = {}
+        self.definitions = {}
+        self.quick = {}
+
+    def cursor(self, cursor_factory=None):
+        return _FakeCursor(self)
+
+    def execute_values(self, cur, sql, argslist, template=None, page_size=100, fetch=False):
+        if "INSERT INTO morph_definitions" in sql:
+            returned = []
+            for morph_id, backend_key in argslist:
+                if backend_key is not None or morph_id not in self.definitions:
+                    self.definitions[morph_id] = backend_key
+                returned.append((morph_id, self.definitions[morph_id]))
+            return returned if fetch else None
+        for avatar_id, *values in argslist:
+            if "avatar_basic_measurements" in sql:
+                self.basic.setdefault(avatar_id, {})[values[0]] = values[1]
+            elif "avatar_body_measurements" in sql:
+                self.body.setdefault(avatar_id, {})[values[0]] = values[1]
+            elif "avatar_morph_targets" in sql:
+                morph_id, backend_key, slider_value, unreal_value = values
+                self.morphs.setdefault(avatar_id, {})[morph_id] = {
+                    "backend_key": backend_key,
+                    "slider_value": slider_value,
+                    "unreal_value": unreal_value,
+                    "updated_at": self.now,
+                }
+        return None
+
+    def quick_json(self, avatar_id):
+        quick = self.quick.get(avatar_id)
+        if quick is None:
+            return None
+        return {
+            "body_shape": quick["body_shape"],
+            "athletic_level": quick["athletic_level"],
+            "measurements": quick["measurements"],
+            "updated_at": _to_char_utc(quick["updated_at"]),
+        }
+
+    def fetch_row(self, avatar_id):
+        morphs = [
+            {
+                "id": morph_id,
+                "backendKey": data["backend_key"] or self.definitions.get(morph_id),
+                "sliderValue": data["slider_value"],
+                "unrealValue": data["unreal_value"],
+                "updatedAt": _to_char_utc(data["updated_at"]),
+            }
+            for morph_id, data in sorted(self.morphs.get(avatar_id, {}).items())
+        ]
+        return {
+            "avatar_id": avatar_id,
+            "basic": self.basic.get(avatar_id) or None,
+            "body": self.body.get(avatar_id) or None,
+            "morphs": morphs or None,
+            "quick_mode_settings": self.quick_json(avatar_id),
+        }
+
+
+class _FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        db = self.db
+        self.rows = []
+        if "DELETE FROM avatar_morph_targets" in sql:
+            avatar_id = params[0]
+            for table in (db.basic, db.body, db.morphs):
+                table.pop(avatar_id, None)
+        elif "INSERT INTO avatar_quickmode_settings" in sql:
+            avatar_id, body_shape, athletic_level, measurements, updated_at = params
+            db.quick[avatar_id] = {
+                "body_shape": body_shape,
+                "athletic_level": athletic_level,
+                "measurements": json.loads(json.dumps(measurements.adapted)),
+                "updated_at": updated_at,
+            }
+        elif "DELETE FROM avatar_quickmode_settings" in sql:
+            db.quick.pop(params[0], None)
+        elif "EXECUTE fetch_measurements" in sql:
+            self.rows = [db.fetch_row(avatar_id) for avatar_id in params[0]]
+        elif "UPDATE avatars" in sql:
+            avatar_id, user_id = params[-2:]
+            self.rows = [
+                {
+                    "id": avatar_id,
+                    "user_id": user_id,
+                    "name": params[0],
+                    "gender": params[1],
+                    "age_range": params[2],
+                    "creation_mode": params[3],
+                    "source": params[4],
+                    "quick_mode": params[5],
+                    "created_by_session": params[6],
+                    "created_at": db.now,
+                    "updated_at": db.now,
+                    "quick_mode_settings": db.quick_json(avatar_id),
+                }
+            ]
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+
+class PersistMeasurementsTests(unittest.TestCase):
+    def setUp(self):
+        self.avatar_id = uuid.UUID("00000000-0000-0000-0000-000000000001")
+        # A fraction with trailing zeros, which PostgreSQL's JSON text would trim.
+        self.now = datetime(2025, 10, 6, 19, 34, 42, 100000, tzinfo=timezone.utc)
+        self.db = _FakeDatabase(self.now)
+        patcher = patch("avatar.repository.execute_values", self.db.execute_values)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _persist(self, **kwargs):
+        options = {
+            "basic": {},
+            "body": {},
+            "morph_targets": [],
+            "quick_mode_settings": None,
+            "quick_mode_settings_is_set": False,
+            "written_at": self.now,
+        }
+        options.update(kwargs)
+        return repository._persist_measurements(self.db, self.avatar_id, **options)
+
+    def _fetch(self):
+        return repository._fetch_measurements(self.db, self.avatar_id)
+
+    def test_written_measurements_and_morphs_match_fetch(self):
+        self.db.definitions["arm"] = "ArmDefinitionKey"
+
+        written = self._persist(
+            basic={"height": 180, "creationMode": "manual"},
+            body={"chest": 95.5},
+            morph_targets=[
+                {"id": "neck"},
+                {"id": "leg", "backendKey": "LegKey", "unrealValue": 2.0},
+                {"id": "arm", "sliderValue": 0.5, "value": 0.5},
+            ],
+        )
+
+        self.assertEqual(written[:3], self._fetch()[:3])
+        basic, body, morphs, _ = written
+        self.assertEqual(basic, {"height": 180.0})
+        self.assertEqual(body, {"chest": 95.5})
+        updated_at = "2025-10-06T19:34:42.100000Z"
+        self.assertEqual(
+            morphs,
+            [
+                {
+                    "id": "arm",
+                    "backendKey": "ArmDefinitionKey",
+                    "sliderValue": 0.5,
+                    "value": 0.5,
+                    "updatedAt": updated_at,
+                },
+                {"id": "leg", "backendKey": "LegKey", "unrealValue": 2.0, "updatedAt": updated_at},
+                {"id": "neck", "updatedAt": updated_at},
+            ],
+        )
+
+    def test_set_quick_mode_settings_match_fetch(self):
+        for provided_updated_at in ("2025-01-02T03:04:05.000000Z", None):
+            settings = {
+                "bodyShape": "hourglass",
+                "athleticLevel": "high",
+                "measurements": {"waistCircumference": 70},
+            }
+            if provided_updated_at:
+                settings["updatedAt"] = provided_updated_at
+            with self.subTest(updated_at=provided_updated_at):
+                written = self._persist(
+                    quick_mode_settings=settings, quick_mode_settings_is_set=True
+                )
+
+                self.assertIsNotNone(written[3])
+                self.assertEqual(written[3], self._fetch()[3])
+
+    def test_cleared_quick_mode_settings_match_fetch(self):
+        self._persist(
+            quick_mode_settings={"bodyShape": "pear"}, quick_mode_settings_is_set=True
+        )
+
+        written = self._persist(quick_mode_settings=None, quick_mode_settings_is_set=True)
+
+        self.assertIsNone(written[3])
+        self.assertIsNone(self._fetch()[3])
+
+    def test_untouched_quick_mode_settings_in_update_match_fetch(self):
+        self._persist(
+            quick_mode_settings={"bodyShape": "pear", "measurements": {"hip": 102.3}},
+            quick_mode_settings_is_set=True,
+            written_at=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        )
+
+        @contextmanager
+        def fake_connection():
+            yield self.db
+
+        with patch("avatar.repository._connection", fake_connection):
+            avatar = repository.update_avatar(
+                "user-123",
+                str(self.avatar_id),
+                name="Runner",
+                gender=None,
+                age_range=None,
+                creation_mode=None,
+                source=None,
+                quick_mode=True,
+                created_by_session=None,
+                basic_measurements={},
+                body_measurements={},
+                morph_targets=[{"id": "arm", "sliderValue": 1.0}],
+                quick_mode_settings=None,
+                quick_mode_settings_is_set=False,
+            )
+
+        _, _, morphs, quick_mode_settings = self._fetch()
+        self.assertEqual(avatar["morphTargets"], morphs)
+        self.assertEqual(avatar["quickModeSettings"], quick_mode_settings)
+        self.assertEqual(quick_mode_settings["updatedAt"], "2025-01-01T00:00:00Z")
+
+
+
+class _ScriptedCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.row = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        self.row = None
+        if "INSERT INTO avatars" in sql:
+            self.conn.insert_attempts += 1
+            self.row = self.conn.insert_results.pop(0)
+
+    def fetchone(self):
+        return self.row
+
+
+class _ScriptedConnection:
+    def __init__(self, insert_results):
+        self.insert_results = list(insert_results)
+        self.insert_attempts = 0
+
+    def cursor(self, cursor_factory=None):
+        return _ScriptedCursor(self)
+
+
+class CreateAvatarSlotTests(unittest.TestCase):
+    def _create(self, conn):
+        @contextmanager
+        def fake_connection():
+            yield conn
+
+        with patch("avatar.repository._connection", fake_connection), patch(
+            "avatar.repository._persist_measurements", return_value=({}, {}, [], None)
+        ):
+            return repository.create_avatar(
+                "user-123",
+                name="Runner",
+                gender=None,
+                age_range=None,
+                creation_mode=None,
+                source=None,
+                quick_mode=False,
+                created_by_session=None,
+                basic_measurements={},
+                body_measurements={},
+                morph_targets=[],
+                quick_mode_settings=None,
+            )
+
+    def _inserted_row(self):
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        return {
+            "id": uuid.UUID("00000000-0000-0000-0000-000000000001"),
+            "user_id": "user-123",
+            "name": "Runner",
+            "gender": None,
+            "age_range": None,
+            "creation_mode": None,
+            "source": None,
+            "quick_mode": False,
+            "created_by_session": None,
+            "created_at": now,
+            "updated_at": now,
+            "free_slots": 1,
+        }
+
+    def test_full_quota_is_rejected_without_retrying(self):
+        conn = _ScriptedConnection([{"id": None, "free_slots": 0}])
+
+        with self.assertRaises(repository.AvatarQuotaExceededError):
+            self._create(conn)
+
+        self.assertEqual(conn.insert_attempts, 1)
+
+    def test_slot_conflict_is_retried_once(self):
+        conn = _ScriptedConnection([{"id": None, "free_slots": 1}, self._inserted_row()])
+
+        avatar = self._create(conn)
+
+        self.assertEqual(conn.insert_attempts, 2)
+        self.assertEqual(avatar["name"], "Runner")
+
+    def test_repeated_slot_conflict_reports_quota(self):
+        conn = _ScriptedConnection(
+            [{"id": None, "free_slots": 1}, {"id": None, "free_slots": 1}]
+        )
+
+        with self.assertRaises(repository.AvatarQuotaExceededError):
+            self._create(conn)
+
+        self.assertEqual(conn.insert_attempts, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,12 @@
+import time
 import unittest
 from unittest.mock import patch
 
+import jwt
+from flask import Flask
 from werkzeug.exceptions import HTTPException
 
+from auth import init_app as init_auth
 from avatar import routes
 
 
@@ -275,6 +279,54 @@ class ApplyPayloadTests(unittest.TestCase):
         self.assertEqual(ctx.exception.code, 400)
         self.assertIn("quickModeSettings.updatedAt", ctx.exception.description)
 
+    @patch("avatar.routes.repository.create_avatar")
+    def test_integer_measurements_are_converted_to_float(self, mock_create):
+        routes._apply_payload(
+            self.user_id,
+            {"basicMeasurements": {"height": 172}, "bodyMeasurements": {"chest": 95.5}},
+        )
+
+        kwargs = mock_create.call_args.kwargs
+        self.assertEqual(kwargs["basic_measurements"], {"height": 172.0})
+        self.assertIsInstance(kwargs["basic_measurements"]["height"], float)
+        self.assertEqual(kwargs["body_measurements"], {"chest": 95.5})
+
+    def test_non_numeric_measurement_rejected(self):
+        payload = {"bodyMeasurements": {"chest": 95.2, "waist": "70"}}
+
+        with self.assertRaises(HTTPException) as ctx:
+            routes._apply_payload(self.user_id, payload)
+
+        self.assertEqual(ctx.exception.code, 400)
+        self.assertIn("'waist' in bodyMeasurements", ctx.exception.description)
+
+    def test_boolean_measurement_rejected(self):
+        payload = {"basicMeasurements": {"height": True, "creationMode": "manual"}}
+
+        with self.assertRaises(HTTPException) as ctx:
+            routes._apply_payload(self.user_id, payload)
+
+        self.assertEqual(ctx.exception.code, 400)
+        self.assertIn("'height' in basicMeasurements", ctx.exception.description)
+
+    def test_morph_targets_sorted_and_deduplicated(self):
+        self.assertEqual(
+            routes._normalize_morph_targets(
+                [{"id": "b", "value": 1}, {"id": "a", "value": 2}, {"id": "b", "value": 3}]
+            ),
+            [
+                {"id": "a", "sliderValue": 2.0, "value": 2.0},
+                {"id": "b", "sliderValue": 3.0, "value": 3.0},
+            ],
+        )
+        self.assertEqual(
+            routes._normalize_morph_targets({"a": 0.5, "c": 1}),
+            [
+                {"id": "a", "sliderValue": 0.5, "value": 0.5},
+                {"id": "c", "sliderValue": 1.0, "value": 1.0},
+            ],
+        )
+
     def test_conflicting_creation_mode_values_rejected(self):
         payload = {
             "creationMode": "Manual",
@@ -288,42 +340,137 @@ class ApplyPayloadTests(unittest.TestCase):
         self.assertIn("creationMode", ctx.exception.description)
 
 
-class DeleteAvatarRouteTests(unittest.TestCase):
+class AvatarRouteTestCase(unittest.TestCase):
     def setUp(self):
         self.user_id = "user-123"
         self.avatar_id = "00000000-0000-0000-0000-000000000001"
 
+        app = Flask(__name__)
+        app.config["JWT_SECRET"] = "test-secret"
+        init_auth(app)
+        app.register_blueprint(routes.avatar_bp)
+        self.client = app.test_client()
+
+        token = jwt.encode(
+            {
+                "sub": self.user_id,
+                "exp": int(time.time()) + 600,
+                "email": "user@example.com",
+                "sid": "session-abc",
+            },
+            "test-secret",
+            algorithm="HS256",
+        )
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+
+class DeleteAvatarRouteTests(AvatarRouteTestCase):
+    def _delete(self, user_id, avatar_id):
+        return self.client.delete(
+            f"/api/users/{user_id}/avatars/{avatar_id}", headers=self.headers
+        )
+
     def test_delete_success_returns_no_content(self):
-        with patch("avatar.routes.require_user_access") as mock_require, patch(
-            "avatar.routes.repository.delete_avatar"
-        ) as mock_delete:
-            response = routes.delete_avatar(self.user_id, self.avatar_id)
+        with patch("avatar.routes.repository.delete_avatar") as mock_delete:
+            response = self._delete(self.user_id, self.avatar_id)
 
-        self.assertEqual(response, ("", 204))
-        mock_require.assert_called_once_with(self.user_id)
+        self.assertEqual(response.status_code, 204)
         mock_delete.assert_called_once_with(self.user_id, self.avatar_id)
 
     def test_delete_missing_avatar_returns_404(self):
-        with patch("avatar.routes.require_user_access") as mock_require, patch(
+        with patch(
             "avatar.routes.repository.delete_avatar",
             side_effect=routes.AvatarNotFoundError("Avatar not found."),
         ):
-            with self.assertRaises(HTTPException) as ctx:
-                routes.delete_avatar(self.user_id, self.avatar_id)
+            response = self._delete(self.user_id, self.avatar_id)
 
-        self.assertEqual(ctx.exception.code, 404)
-        mock_require.assert_called_once_with(self.user_id)
+        self.assertEqual(response.status_code, 404)
 
     def test_delete_invalid_identifier_returns_400(self):
-        with patch("avatar.routes.require_user_access") as mock_require, patch(
+        with patch(
             "avatar.routes.repository.delete_avatar",
             side_effect=ValueError("invalid UUID"),
         ):
-            with self.assertRaises(HTTPException) as ctx:
-                routes.delete_avatar(self.user_id, "not-a-uuid")
+            response = self._delete(self.user_id, "not-a-uuid")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete_for_another_user_returns_403(self):
+        with patch("avatar.routes.repository.delete_avatar") as mock_delete:
+            response = self._delete("someone-else", self.avatar_id)
+
+        self.assertEqual(response.status_code, 403)
+        mock_delete.assert_not_called()
+
+    def test_delete_without_token_returns_401(self):
+        with patch("avatar.routes.repository.delete_avatar") as mock_delete:
+            response = self.client.delete(
+                f"/api/users/{self.user_id}/avatars/{self.avatar_id}"
+            )
+
+        self.assertEqual(response.status_code, 401)
+        mock_delete.assert_not_called()
+
+
+class BatchAvatarRouteTests(AvatarRouteTestCase):
+    def _batch(self, payload):
+        return self.client.post(
+            f"/api/users/{self.user_id}/avatars:batch", json=payload, headers=self.headers
+        )
+
+    def test_batch_returns_requested_avatars(self):
+        avatars = [{"id": self.avatar_id}]
+        with patch(
+            "avatar.routes.repository.get_avatars_bulk", return_value=avatars
+        ) as mock_bulk:
+            response = self._batch({"ids": [self.avatar_id]})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.get_json(), {"userId": self.user_id, "count": 1, "items": avatars}
+        )
+        mock_bulk.assert_called_once_with(self.user_id, [self.avatar_id])
+
+    def test_batch_requires_list_of_ids(self):
+        with patch("avatar.routes.repository.get_avatars_bulk") as mock_bulk:
+            response = self._batch({"ids": self.avatar_id})
+
+        self.assertEqual(response.status_code, 400)
+        mock_bulk.assert_not_called()
+
+    def test_batch_invalid_identifier_returns_400(self):
+        with patch(
+            "avatar.routes.repository.get_avatars_bulk",
+            side_effect=ValueError("invalid UUID"),
+        ):
+            response = self._batch({"ids": ["not-a-uuid"]})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_malformed_body_returns_400(self):
+        with patch("avatar.routes.repository.get_avatars_bulk") as mock_bulk:
+            response = self.client.post(
+                f"/api/users/{self.user_id}/avatars:batch",
+                data=b"{not json",
+                content_type="application/json",
+                headers=self.headers,
+            )
+
+        self.assertEqual(response.status_code, 400)
+        mock_bulk.assert_not_called()
+
+    def test_batch_non_json_content_type_returns_400(self):
+        with patch("avatar.routes.repository.get_avatars_bulk") as mock_bulk:
+            response = self.client.post(
+                f"/api/users/{self.user_id}/avatars:batch",
+                data=b'{"ids": []}',
+                content_type="text/plain",
+                headers=self.headers,
+            )
+
+        self.assertEqual(response.status_code, 400)
+        mock_bulk.assert_not_called()
 
-        self.assertEqual(ctx.exception.code, 400)
-        mock_require.assert_called_once_with(self.user_id)
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
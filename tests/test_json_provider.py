@@ -0,0 +1,37 @@
+import decimal
+import unittest
+import uuid
+from datetime import datetime, timezone
+
+from flask import Flask
+
+from json_provider import OrJSONProvider
+
+
+class OrJSONProviderTests(unittest.TestCase):
+    def setUp(self):
+        self.provider = OrJSONProvider(Flask(__name__))
+
+    def test_serializes_app_value_types(self):
+        payload = {
+            "id": uuid.UUID("00000000-0000-0000-0000-000000000001"),
+            "at": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            "price": decimal.Decimal("12.50"),
+        }
+
+        self.assertEqual(
+            self.provider.loads(self.provider.dumps(payload)),
+            {
+                "id": "00000000-0000-0000-0000-000000000001",
+                "at": "2025-01-02T03:04:05+00:00",
+                "price": "12.50",
+            },
+        )
+
+    def test_unsupported_type_raises_type_error(self):
+        with self.assertRaises(TypeError):
+            self.provider.dumps({"value": object()})
+
+
+if __name__ == "__main__":
+    unittest.main()